@@ -5,6 +5,7 @@ Compresses JPG and PNG images to a target KB size with optimal quality/resolutio
 
 import os
 import io
+import math
 import re
 import uuid
 import logging
@@ -12,12 +13,73 @@ import zipfile
 import shutil
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, Response
+from flask.json.provider import JSONProvider
 from werkzeug.utils import secure_filename
+from cachetools import TTLCache
+import orjson
 from PIL import Image
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Optional: libjpeg-turbo JPEG encoder (SIMD DCT/color-conversion/Huffman,
+# 2-6x faster than Pillow's stock libjpeg path). Falls back to Pillow when
+# the python binding or the native library is not installed.
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB, TJPF_GRAY, TJSAMP_GRAY
+    _turbo = TurboJPEG() if np is not None else None
+except Exception:
+    _turbo = None
+
+# Optional: GPU JPEG encode via nvJPEG (nvidia-nvimgcodec), which encodes at
+# multi-GB/s on CUDA devices. Opt-in via the NVJPEG env var so CPU-only
+# deployments never pay the probe; falls back to libjpeg-turbo/Pillow.
+_nvjpeg = None
+if os.environ.get('NVJPEG'):
+    try:
+        from nvidia import nvimgcodec
+        _nvjpeg = nvimgcodec.Encoder() if np is not None else None
+    except Exception:
+        _nvjpeg = None
+
+# Optional: SIMD Lanczos resize via cykooz.resizer (Rust fast_image_resize,
+# ~8-10x faster than Pillow's scalar LANCZOS). Falls back to Pillow.
+try:
+    from cykooz.resizer import CpuExtensions, FilterType, ResizeAlg, Resizer
+    _resizer = Resizer(ResizeAlg.convolution(FilterType.lanczos3))
+    # Prefer the widest SIMD path the host supports. The enum only defines
+    # the extensions for the build platform (no `neon` on x86_64 wheels and
+    # vice versa), so look names up defensively; setting an extension the
+    # CPU lacks raises, in which case the auto-detected default is kept.
+    for _ext in [getattr(CpuExtensions, _name)
+                 for _name in ('avx2', 'sse4_1', 'neon')
+                 if hasattr(CpuExtensions, _name)]:
+        try:
+            _resizer.cpu_extensions = _ext
+            break
+        except Exception:
+            continue
+except Exception:
+    _resizer = None
+
+# Optional: oxipng PNG optimizer (multithreaded Rust, better filters and
+# deflate than Pillow's zlib). Applied once to the final accepted PNG only.
+try:
+    import oxipng as _oxipng
+except ImportError:
+    _oxipng = None
+
+# Optimistic estimate of oxipng level-2 output relative to the
+# compress_level=1 probe encode, used only to screen candidate scales;
+# acceptance is always judged on the bytes oxipng actually produces
+OXIPNG_PROBE_RATIO = 0.7
+
 # Configure logging
 LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
 logging.basicConfig(
@@ -27,7 +89,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class OrjsonProvider(JSONProvider):
+    """Serialize JSON responses with orjson. The /upload response carries one
+    result dict per file and can reach MBs on large batches; orjson's C-level
+    encoder is typically 3-10x faster than stdlib json there."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # Security: UUID validation pattern to prevent path traversal
 UUID_PATTERN = re.compile(r'^[a-f0-9]{8}-[a-f0-9]{4}-4[a-f0-9]{3}-[89ab][a-f0-9]{3}-[a-f0-9]{12}$')
@@ -43,6 +118,9 @@ OUTPUT_FOLDER = '/tmp/pycompressweb/output'
 ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png'}
 MAX_CONTENT_LENGTH = 500 * 1024 * 1024  # 500MB max total upload to handle multiple large files
 
+# Persist raw uploads to disk for debugging; normally inputs stay in memory
+KEEP_UPLOADS = os.environ.get('KEEP_UPLOADS', '').lower() in ('1', 'true', 'yes')
+
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['OUTPUT_FOLDER'] = OUTPUT_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
@@ -52,8 +130,11 @@ def request_entity_too_large(error):
     """Handle large file uploads gracefully."""
     return jsonify({'error': 'File too large. Maximum upload size is 500MB.'}), 413
 
-# Store session data (in production, use Redis or similar)
-sessions = {}
+# Store session data (in production, use Redis or similar). TTL-bounded so
+# entries expire with their on-disk session folders instead of leaking;
+# guarded by a lock since TTLCache mutations are not thread-safe.
+sessions = TTLCache(maxsize=10_000, ttl=3600)
+_sessions_lock = threading.Lock()
 
 
 def allowed_file(filename):
@@ -61,33 +142,140 @@ def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def encode_image(image, quality, format='JPEG'):
-    """Encode image to a BytesIO buffer and return (size_kb, buffer)."""
-    buffer = io.BytesIO()
+def resize_image(image, size):
+    """Lanczos-resize a PIL image to (width, height), using the SIMD
+    fast_image_resize kernels when cykooz.resizer is installed."""
+    if _resizer is not None and image.mode in ('RGB', 'RGBA', 'L'):
+        dst = Image.new(image.mode, size)
+        _resizer.resize_pil(image, dst)
+        return dst
+    return image.resize(size, Image.LANCZOS)
+
+
+def jpeg_pixel_array(image):
+    """Convert a PIL image to a contiguous (array, mode) pair for the
+    accelerated JPEG encoders, or None if none is available or the mode
+    unsupported. Compute this once per image and pass it to encode_image so
+    repeated binary-search encodes skip the PIL-to-array conversion."""
+    if (_turbo is None and _nvjpeg is None) or image.mode not in ('RGB', 'L'):
+        return None
+    return np.ascontiguousarray(np.asarray(image)), image.mode
+
+
+class _CountingSink:
+    """File-like that discards writes and only counts bytes. Used for probe
+    encodes where just the encoded size matters, so a multi-MB payload isn't
+    buffered only to read its length."""
+    __slots__ = ('n',)
+
+    def __init__(self):
+        self.n = 0
+
+    def write(self, data):
+        self.n += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def tell(self):
+        return self.n
+
+    def seek(self, *args, **kwargs):
+        return self.n
+
+
+def encode_image(image, quality, format='JPEG', pixel_array=None, count_only=False):
+    """Encode image and return (size_kb, buffer). With count_only the encoded
+    bytes are discarded through a counting sink and buffer is None.
+
+    JPEG encodes go through libjpeg-turbo when available, with Pillow as
+    the fallback for other formats/modes or when turbo is not installed.
+    """
+    global _nvjpeg
+    if format == 'JPEG' and (_nvjpeg is not None or _turbo is not None):
+        if pixel_array is None:
+            pixel_array = jpeg_pixel_array(image)
+        if pixel_array is not None:
+            arr, mode = pixel_array
+            if _nvjpeg is not None and mode == 'RGB':
+                try:
+                    data = bytes(_nvjpeg.encode(
+                        nvimgcodec.as_image(arr), 'jpeg',
+                        nvimgcodec.EncodeParams(quality=float(quality))))
+                    return len(data) / 1024, None if count_only else io.BytesIO(data)
+                except Exception as e:
+                    # Runtime GPU failure (device lost, CUDA OOM, encoder
+                    # built without a usable device): disable the nvjpeg
+                    # path for this process and degrade to the CPU encoders
+                    _nvjpeg = None
+                    logger.warning(f'nvJPEG encode failed, falling back to CPU encoders: {e}')
+            if _turbo is not None:
+                if mode == 'L':
+                    # Grayscale sources must also request grayscale
+                    # subsampling: the default 4:2:2 asks libjpeg-turbo for
+                    # a gray-to-YCbCr conversion it doesn't implement
+                    data = _turbo.encode(arr, quality=quality,
+                                         pixel_format=TJPF_GRAY,
+                                         jpeg_subsample=TJSAMP_GRAY)
+                else:
+                    data = _turbo.encode(arr, quality=quality, pixel_format=TJPF_RGB)
+                return len(data) / 1024, None if count_only else io.BytesIO(data)
+    out = _CountingSink() if count_only else io.BytesIO()
     if format == 'PNG':
-        compress_level = max(1, min(9, 9 - (quality // 11)))
-        image.save(buffer, format=format, optimize=True, compress_level=compress_level)
+        if _oxipng is not None:
+            # Cheap pixel-exact encode; the real compression happens once,
+            # when oxipng runs over the accepted candidate
+            image.save(out, format=format, compress_level=1)
+        else:
+            compress_level = max(1, min(9, 9 - (quality // 11)))
+            image.save(out, format=format, optimize=True, compress_level=compress_level)
     else:
-        image.save(buffer, format=format, quality=quality, optimize=True)
-    return buffer.tell() / 1024, buffer
+        image.save(out, format=format, quality=quality, optimize=True)
+    return out.tell() / 1024, None if count_only else out
+
+
+def optimize_png(data):
+    """Run oxipng over encoded PNG bytes, returning the input unchanged if
+    optimization fails. Called once per accepted candidate so size checks
+    can compare the real optimized output against the target."""
+    try:
+        return _oxipng.optimize_from_memory(data, level=2, strip=_oxipng.StripChunks.safe())
+    except Exception as e:
+        logger.debug(f'oxipng optimization failed, keeping Pillow output: {e}')
+        return data
+
+
+def write_output(output_path, buffer):
+    """Write an accepted encode buffer to disk and return the written size in KB."""
+    buffer.seek(0)
+    data = buffer.read()
+    with open(output_path, 'wb') as f:
+        f.write(data)
+    return len(data) / 1024
 
 
-def compress_to_target_size(image_path, target_kb, output_path, output_format='original'):
+def compress_to_target_size(image_source, target_kb, output_path, output_format='original'):
     """
     Compress image to target KB size with best possible quality.
     Uses binary search on both scale factor and quality for fast convergence,
     and reuses the encoded buffer to avoid redundant encoding.
-    
+
     Args:
-        image_path: Path to source image
+        image_source: Path to source image, or the raw image bytes
         target_kb: Target file size in KB
         output_path: Path for compressed output
         output_format: 'original', 'jpg', or 'png'
-    
+
     Returns dict with compression results.
     """
-    original_image = Image.open(image_path)
-    original_ext = os.path.splitext(image_path)[1].lower()
+    if isinstance(image_source, (bytes, bytearray)):
+        original_image = Image.open(io.BytesIO(image_source))
+        original_size_kb = len(image_source) / 1024
+    else:
+        original_image = Image.open(image_source)
+        original_size_kb = os.path.getsize(image_source) / 1024
+    original_ext = os.path.splitext(output_path)[1].lower()
     
     # Determine output format
     if output_format == 'jpg':
@@ -108,18 +296,35 @@ def compress_to_target_size(image_path, target_kb, output_path, output_format='o
     output_base = os.path.splitext(output_path)[0]
     output_path = output_base + out_ext
     
+    source_width, source_height = original_image.size
+
+    # For JPEG sources far above target, let libjpeg decode at a reduced
+    # size (IDCT scaling by 1/2, 1/4, 1/8) instead of decoding the full
+    # resolution only to throw most pixels away in the scale search.
+    # draft() must run before any pixel access and rounds up to the nearest
+    # supported fraction, so the scale search keeps headroom to fine-tune.
+    if original_image.format == 'JPEG' and original_size_kb > 4 * target_kb:
+        est_scale = min(1.0, ((target_kb / original_size_kb) ** 0.5) * 1.3)
+        original_image.draft(None, (max(1, int(source_width * est_scale)),
+                                    max(1, int(source_height * est_scale))))
+
     # Convert to appropriate mode
     if save_format == 'JPEG' and original_image.mode in ('RGBA', 'P', 'LA'):
         original_image = original_image.convert('RGB')
     elif save_format == 'PNG' and original_image.mode == 'P':
         original_image = original_image.convert('RGBA')
-    
-    original_size_kb = os.path.getsize(image_path) / 1024
+
+    # Scale search runs relative to the (possibly drafted) decode size, so
+    # reported scale factors are computed against the source width instead
+    # of the search-internal scale
     width, height = original_image.size
-    
+
+    def effective_scale(final_width):
+        return round(final_width / source_width, 3)
+
     result = {
         'original_size_kb': round(original_size_kb, 2),
-        'original_resolution': f'{width}x{height}',
+        'original_resolution': f'{source_width}x{source_height}',
         'final_size_kb': 0,
         'final_resolution': '',
         'quality_used': 0,
@@ -140,21 +345,74 @@ def compress_to_target_size(image_path, target_kb, output_path, output_format='o
         result['output_filename'] = os.path.basename(output_path)
         return result
     
-    def find_best_quality(image, save_fmt, target):
+    # Memoize encoded probes by (scale, quality): the accepted scale's
+    # min-quality probe is hit both by the outer scale bisection and the
+    # quality search's early-exit check, and accepted buffers are written
+    # straight to disk instead of being re-encoded.
+    encode_cache = OrderedDict()
+
+    def encode_cached(image, scale, quality, pixel_array=None, count_only=False):
+        key = (scale, quality)
+        cached = encode_cache.get(key)
+        # A size-only cache entry (buffer=None) satisfies probes, but a
+        # caller that needs the bytes forces a full re-encode of that entry
+        if cached is not None and (count_only or cached[1] is not None):
+            encode_cache.move_to_end(key)
+            return cached
+        size_kb, buf = encode_image(image, quality, save_format, pixel_array, count_only)
+        encode_cache[key] = (size_kb, buf)
+        if len(encode_cache) > 32:
+            encode_cache.popitem(last=False)
+        return size_kb, buf
+
+    # With oxipng producing the final bytes, PNG probe encodes are fixed
+    # level-1 passes whose size doesn't depend on quality, so one probe per
+    # scale decides feasibility and the quality bisect is skipped
+    png_single_probe = save_format == 'PNG' and _oxipng is not None
+
+    def find_best_quality(image, scale, target, pixel_array=None):
         """Binary search for best quality that fits target. Returns (quality, size, buffer) or None."""
+        if png_single_probe:
+            # The discounted level-1 size only screens out hopeless scales;
+            # acceptance is judged on the bytes oxipng actually produces,
+            # since its real shrink varies per image
+            size_kb, buf = encode_cached(image, scale, 95, pixel_array)
+            if size_kb * OXIPNG_PROBE_RATIO > target:
+                return None
+            buf.seek(0)
+            optimized = optimize_png(buf.read())
+            if len(optimized) / 1024 > target:
+                return None
+            return 95, len(optimized) / 1024, io.BytesIO(optimized)
+
         min_q, max_q = 25, 95
         best_quality = None
         best_size = float('inf')
         best_buffer = None
-        
+
+        # Convert to an encoder-compatible array once (unless the caller
+        # already has one); every encode below reuses it
+        if pixel_array is None and save_format == 'JPEG':
+            pixel_array = jpeg_pixel_array(image)
+
         # Early exit: if minimum quality is already too big, no solution at this scale
-        min_size, _ = encode_image(image, min_q, save_fmt)
+        min_size, _ = encode_cached(image, scale, min_q, pixel_array, count_only=True)
         if min_size > target:
             return None
-        
+
+        # Seed the first probe from the q=25 measurement instead of always
+        # starting at 60: JPEG size is roughly log-linear in quality with
+        # s(95)/s(25) typically ~4x, so interpolating toward the target
+        # lands 1-2 probes closer. Bisection proceeds normally afterwards.
+        seed_q = None
+        if save_format == 'JPEG' and min_size > 0:
+            seed_q = int(25 + 70 * math.log(target / min_size) / math.log(4))
+            seed_q = max(min_q + 1, min(max_q - 1, seed_q))
+
         while min_q <= max_q:
-            mid_q = (min_q + max_q) // 2
-            size_kb, buf = encode_image(image, mid_q, save_fmt)
+            mid_q = seed_q if seed_q is not None else (min_q + max_q) // 2
+            seed_q = None
+            size_kb, buf = encode_cached(image, scale, mid_q, pixel_array)
             
             if size_kb <= target:
                 best_quality = mid_q
@@ -168,24 +426,29 @@ def compress_to_target_size(image_path, target_kb, output_path, output_format='o
             return best_quality, best_size, best_buffer
         return None
 
-    # Try quality-only first (scale=1.0)
-    quality_result = find_best_quality(original_image, save_format, target_kb)
+    # Try quality-only first (scale=1.0); the original is used as-is — no
+    # defensive copy is needed since encoding never mutates pixel data
+    quality_result = find_best_quality(original_image, 1.0, target_kb)
     if quality_result:
         best_quality, best_size, best_buffer = quality_result
-        best_buffer.seek(0)
-        with open(output_path, 'wb') as f:
-            f.write(best_buffer.read())
-        result['final_size_kb'] = round(best_size, 2)
+        final_size = write_output(output_path, best_buffer)
+        result['final_size_kb'] = round(final_size, 2)
         result['final_resolution'] = f'{width}x{height}'
         result['quality_used'] = best_quality
-        result['scale_factor'] = 1.0
+        result['scale_factor'] = effective_scale(width)
         result['output_filename'] = os.path.basename(output_path)
         return result
     
-    # Binary search on scale factors (0.1 to 0.9) to find the largest viable scale
+    # Binary search on scale factors (0.1 to 0.9) to find the largest viable
+    # scale. Each bisection step encodes once to test feasibility (minimum
+    # quality for JPEG, the fixed level-1 pass for oxipng-backed PNG); the
+    # full quality search runs once, on the accepted scale.
     scale_lo, scale_hi = 1, 9  # represents 0.1 to 0.9
-    best_scale_result = None
-    
+    best_scale = None
+    # scale -> (resized image, pixel array): neither the resize nor the
+    # PIL-to-array conversion is redone when a probed scale is accepted
+    scaled_cache = {}
+
     while scale_lo <= scale_hi:
         scale_mid = (scale_lo + scale_hi) // 2
         scale = scale_mid / 10.0
@@ -194,79 +457,118 @@ def compress_to_target_size(image_path, target_kb, output_path, output_format='o
         if new_w < 1 or new_h < 1:
             scale_lo = scale_mid + 1
             continue
-        
-        scaled_image = original_image.resize((new_w, new_h), Image.LANCZOS)
-        quality_result = find_best_quality(scaled_image, save_format, target_kb)
-        
-        if quality_result:
-            best_scale_result = (scale, scaled_image, quality_result)
+
+        scaled_image = resize_image(original_image, (new_w, new_h))
+        pixel_array = jpeg_pixel_array(scaled_image) if save_format == 'JPEG' else None
+        scaled_cache[scale] = (scaled_image, pixel_array)
+        probe_q = 95 if png_single_probe else 25
+        min_size, _ = encode_cached(scaled_image, scale, probe_q, pixel_array, count_only=True)
+        if png_single_probe:
+            min_size *= OXIPNG_PROBE_RATIO
+
+        if min_size <= target_kb:
+            best_scale = scale
             scale_lo = scale_mid + 1  # try larger scale (higher value = less downscaling)
         else:
             scale_hi = scale_mid - 1  # need smaller scale (more downscaling)
-    
-    if best_scale_result:
-        scale, scaled_image, (best_quality, best_size, best_buffer) = best_scale_result
-        best_buffer.seek(0)
-        with open(output_path, 'wb') as f:
-            f.write(best_buffer.read())
-        new_w, new_h = scaled_image.size
-        result['final_size_kb'] = round(best_size, 2)
-        result['final_resolution'] = f'{new_w}x{new_h}'
-        result['quality_used'] = best_quality
-        result['scale_factor'] = scale
-        result['output_filename'] = os.path.basename(output_path)
-        return result
+
+    # Walk down from the accepted scale. For JPEG the quality search always
+    # succeeds there (feasibility at min quality was just established); for
+    # oxipng-backed PNG acceptance is re-judged on the real optimized bytes,
+    # which can overshoot the screened estimate, so step to smaller scales
+    # until the written size genuinely fits.
+    scale_idx = int(round(best_scale * 10)) if best_scale is not None else 0
+    while scale_idx >= 1:
+        scale = scale_idx / 10.0
+        if scale in scaled_cache:
+            scaled_image, pixel_array = scaled_cache[scale]
+        else:
+            new_w = int(width * scale)
+            new_h = int(height * scale)
+            if new_w < 1 or new_h < 1:
+                break
+            scaled_image = resize_image(original_image, (new_w, new_h))
+            pixel_array = jpeg_pixel_array(scaled_image) if save_format == 'JPEG' else None
+            scaled_cache[scale] = (scaled_image, pixel_array)
+
+        quality_result = find_best_quality(scaled_image, scale, target_kb, pixel_array)
+        if quality_result:
+            best_quality, best_size, best_buffer = quality_result
+            final_size = write_output(output_path, best_buffer)
+            new_w, new_h = scaled_image.size
+            result['final_size_kb'] = round(final_size, 2)
+            result['final_resolution'] = f'{new_w}x{new_h}'
+            result['quality_used'] = best_quality
+            result['scale_factor'] = effective_scale(new_w)
+            result['output_filename'] = os.path.basename(output_path)
+            return result
+        scale_idx -= 1
     
     # Fallback: use minimum quality at minimum scale
-    min_scale_image = original_image.resize(
-        (max(1, int(width * 0.1)), max(1, int(height * 0.1))),
-        Image.LANCZOS
+    min_scale_image = resize_image(
+        original_image,
+        (max(1, int(width * 0.1)), max(1, int(height * 0.1)))
     )
-    _, fallback_buffer = encode_image(min_scale_image, 25, save_format)
-    fallback_buffer.seek(0)
-    with open(output_path, 'wb') as f:
-        f.write(fallback_buffer.read())
-    final_size = os.path.getsize(output_path) / 1024
-    
+    fallback_q = 95 if png_single_probe else 25
+    _, fallback_buffer = encode_cached(min_scale_image, 0.1, fallback_q)
+    if png_single_probe:
+        fallback_buffer.seek(0)
+        fallback_buffer = io.BytesIO(optimize_png(fallback_buffer.read()))
+    final_size = write_output(output_path, fallback_buffer)
+
     result['final_size_kb'] = round(final_size, 2)
     new_w, new_h = min_scale_image.size
     result['final_resolution'] = f'{new_w}x{new_h}'
-    result['quality_used'] = 25
-    result['scale_factor'] = 0.1
+    result['quality_used'] = fallback_q
+    result['scale_factor'] = effective_scale(new_w)
     result['output_filename'] = os.path.basename(output_path)
     
     return result
 
 
-_last_cleanup_time = 0.0
+def compress_to_target_size_job(job):
+    """Compress a single file from a job tuple. Top-level so it is picklable
+    for ProcessPoolExecutor workers; exceptions are caught per file and
+    returned as error dicts so one bad image never fails the whole batch."""
+    image_source, target_kb, output_file, output_format, filename, original_filename = job
+    try:
+        compression_result = compress_to_target_size(image_source, target_kb, output_file, output_format)
+        compression_result['filename'] = compression_result.get('output_filename', filename)
+        compression_result['original_filename'] = original_filename
+        compression_result['success'] = True
+        logger.info(f'Compressed {filename}: {compression_result["original_size_kb"]}KB → {compression_result["final_size_kb"]}KB (quality={compression_result["quality_used"]}, scale={compression_result["scale_factor"]})')
+        return compression_result
+    except Exception as e:
+        logger.error(f'Failed to compress {filename}: {str(e)}')
+        return {
+            'filename': filename,
+            'original_filename': original_filename,
+            'success': False,
+            'error': str(e)
+        }
+
+
 _cleanup_lock = threading.Lock()
-_CLEANUP_INTERVAL_SECONDS = 60
+_CLEANUP_INTERVAL_SECONDS = 300
 
 
 def cleanup_old_sessions(max_age_hours=1):
-    """Remove session folders older than max_age_hours. Rate-limited to once per minute."""
-    global _last_cleanup_time
-    
-    now = time.monotonic()
-    if now - _last_cleanup_time < _CLEANUP_INTERVAL_SECONDS:
-        return
-    
+    """Remove session folders older than max_age_hours."""
     # Use a lock so only one thread runs cleanup at a time
     if not _cleanup_lock.acquire(blocking=False):
         return
     try:
-        _last_cleanup_time = now
-        cutoff = datetime.now() - timedelta(hours=max_age_hours)
-        
+        cutoff_ts = (datetime.now() - timedelta(hours=max_age_hours)).timestamp()
+
         cleaned_count = 0
         for folder in [UPLOAD_FOLDER, OUTPUT_FOLDER]:
             if os.path.exists(folder):
-                for session_id in os.listdir(folder):
-                    session_path = os.path.join(folder, session_id)
-                    if os.path.isdir(session_path):
-                        mtime = datetime.fromtimestamp(os.path.getmtime(session_path))
-                        if mtime < cutoff:
-                            shutil.rmtree(session_path, ignore_errors=True)
+                # scandir serves is_dir/stat from the directory listing,
+                # avoiding the extra stat syscalls of listdir + isdir + getmtime
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False) and entry.stat().st_mtime < cutoff_ts:
+                            shutil.rmtree(entry.path, ignore_errors=True)
                             cleaned_count += 1
         if cleaned_count > 0:
             logger.debug(f'Cleaned up {cleaned_count} expired session folders')
@@ -274,6 +576,20 @@ def cleanup_old_sessions(max_age_hours=1):
         _cleanup_lock.release()
 
 
+def _session_janitor():
+    """Periodic disk housekeeping in a daemon thread, so rmtree of large
+    session trees never blocks an HTTP handler."""
+    while True:
+        try:
+            cleanup_old_sessions()
+        except Exception as e:
+            logger.warning(f'Session cleanup failed: {e}')
+        time.sleep(_CLEANUP_INTERVAL_SECONDS)
+
+
+threading.Thread(target=_session_janitor, name='session-janitor', daemon=True).start()
+
+
 @app.route('/')
 def index():
     """Render the main upload page."""
@@ -283,9 +599,6 @@ def index():
 @app.route('/upload', methods=['POST'])
 def upload_files():
     """Handle batch file upload and compression."""
-    # Cleanup old sessions periodically
-    cleanup_old_sessions()
-    
     if 'files[]' not in request.files:
         logger.warning('Upload request received with no files')
         return jsonify({'error': 'No files provided'}), 400
@@ -308,59 +621,47 @@ def upload_files():
     session_id = str(uuid.uuid4())
     upload_path = os.path.join(UPLOAD_FOLDER, session_id)
     output_path = os.path.join(OUTPUT_FOLDER, session_id)
-    os.makedirs(upload_path, exist_ok=True)
     os.makedirs(output_path, exist_ok=True)
     logger.debug(f'Created session {session_id[:8]}')
-    
+
     results = []
     processed_count = 0
-    
-    # Save all uploaded files first, then compress in parallel
+
+    # Read uploads into memory and build compression jobs — no round-trip
+    # through the filesystem; raw inputs hit disk only when KEEP_UPLOADS is set
     compress_jobs = []
+    used_names = set()
     for file in files:
         if file and file.filename and allowed_file(file.filename):
             filename = secure_filename(file.filename)
-            
+
             # Handle duplicate filenames
             base, ext = os.path.splitext(filename)
             counter = 1
             original_filename = filename
-            while os.path.exists(os.path.join(upload_path, filename)):
+            while filename in used_names:
                 filename = f"{base}_{counter}{ext}"
                 counter += 1
-            
-            input_file = os.path.join(upload_path, filename)
+            used_names.add(filename)
+
+            data = file.read()
+            if KEEP_UPLOADS:
+                os.makedirs(upload_path, exist_ok=True)
+                with open(os.path.join(upload_path, filename), 'wb') as f:
+                    f.write(data)
+
             output_file = os.path.join(output_path, filename)
-            
-            # Save uploaded file
-            file.save(input_file)
-            compress_jobs.append((input_file, target_kb, output_file, output_format, filename, original_filename))
+            compress_jobs.append((data, target_kb, output_file, output_format, filename, original_filename))
     
-    def _compress_one(job):
-        input_file, t_kb, output_file, out_fmt, filename, original_filename = job
-        try:
-            compression_result = compress_to_target_size(input_file, t_kb, output_file, out_fmt)
-            compression_result['filename'] = compression_result.get('output_filename', filename)
-            compression_result['original_filename'] = original_filename
-            compression_result['success'] = True
-            logger.info(f'Compressed {filename}: {compression_result["original_size_kb"]}KB → {compression_result["final_size_kb"]}KB (quality={compression_result["quality_used"]}, scale={compression_result["scale_factor"]})')
-            return compression_result
-        except Exception as e:
-            logger.error(f'Failed to compress {filename}: {str(e)}')
-            return {
-                'filename': filename,
-                'original_filename': original_filename,
-                'success': False,
-                'error': str(e)
-            }
-    
-    # Compress images in parallel using threads (Pillow releases the GIL for C operations)
+    # Compress images in parallel across processes: JPEG/PNG encoding is
+    # CPU-bound, so worker processes scale with core count instead of
+    # serializing on the GIL. Session bookkeeping stays in the parent.
     max_workers = min(len(compress_jobs), os.cpu_count() or 2)
     if max_workers > 1:
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            results = list(executor.map(_compress_one, compress_jobs))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(compress_to_target_size_job, compress_jobs))
     else:
-        results = [_compress_one(job) for job in compress_jobs]
+        results = [compress_to_target_size_job(job) for job in compress_jobs]
     
     processed_count = sum(1 for r in results if r.get('success'))
     
@@ -371,11 +672,12 @@ def upload_files():
         return jsonify({'error': 'No valid image files were processed'}), 400
     
     # Store session info
-    sessions[session_id] = {
-        'created': datetime.now(),
-        'results': results,
-        'target_kb': target_kb
-    }
+    with _sessions_lock:
+        sessions[session_id] = {
+            'created': datetime.now(),
+            'results': results,
+            'target_kb': target_kb
+        }
     
     logger.info(f'Session {session_id[:8]}: Processed {processed_count} images successfully')
     return jsonify({
@@ -386,6 +688,42 @@ def upload_files():
     })
 
 
+class _ZipStreamBuffer:
+    """Minimal unseekable file-like that collects zipfile output so it can be
+    drained into a streaming response one file at a time."""
+
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+
+def stream_zip(output_path, filenames):
+    """Yield a ZIP archive of the given files incrementally. Entries are
+    stored uncompressed — the payloads are already JPEG/PNG, so deflate
+    would burn CPU for ~0% extra ratio."""
+    buffer = _ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as zip_file:
+        for filename in filenames:
+            zip_file.write(os.path.join(output_path, filename), arcname=filename)
+            yield from buffer.drain()
+    yield from buffer.drain()
+
+
 @app.route('/download/<session_id>')
 def download_zip(session_id):
     """Create and download ZIP file with compressed images."""
@@ -401,23 +739,18 @@ def download_zip(session_id):
         return jsonify({'error': 'Session not found or expired'}), 404
     
     logger.info(f'ZIP download started for session {session_id[:8]}')
-    
-    # Create ZIP file in memory
-    zip_buffer = io.BytesIO()
-    
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for filename in os.listdir(output_path):
-            file_path = os.path.join(output_path, filename)
-            if os.path.isfile(file_path):
-                zip_file.write(file_path, filename)
-    
-    zip_buffer.seek(0)
-    
-    return send_file(
-        zip_buffer,
+
+    # Stream the archive instead of building it in memory: peak memory is
+    # one file rather than the whole session's output
+    filenames = sorted(
+        filename for filename in os.listdir(output_path)
+        if os.path.isfile(os.path.join(output_path, filename))
+    )
+
+    return Response(
+        stream_zip(output_path, filenames),
         mimetype='application/zip',
-        as_attachment=True,
-        download_name=f'compressed_images_{session_id[:8]}.zip'
+        headers={'Content-Disposition': f'attachment; filename=compressed_images_{session_id[:8]}.zip'}
     )
 
 
@@ -435,8 +768,8 @@ def cleanup_session(session_id):
     shutil.rmtree(upload_path, ignore_errors=True)
     shutil.rmtree(output_path, ignore_errors=True)
     
-    if session_id in sessions:
-        del sessions[session_id]
+    with _sessions_lock:
+        sessions.pop(session_id, None)
     
     logger.info(f'Session {session_id[:8]} cleaned up manually')
     return jsonify({'success': True})